@@ -1,4 +1,5 @@
 import os
+import sys
 import weaviate
 from weaviate.classes.init import Auth
 import weaviate.classes as wvc
@@ -8,17 +9,42 @@ WEAVIATE_CLUSTER_URL = os.getenv('WEAVIATE_URL')
 WEAVIATE_API_KEY = os.getenv('WEAVIATE_API_KEY')
 MODEL = "Snowflake/snowflake-arctic-embed-l-v2.0"
 
+# HNSW search-time ef per profile: lower is faster, higher recalls more.
+# Weaviate applies ef per collection, not per query.
+ANN_PROFILES = {"fast": 40, "balanced": 100, "recall": 400}
+ANN_PROFILE = os.getenv('ANN_PROFILE', 'balanced')
+ANN_PQ = os.getenv('ANN_PQ', '').lower() in ('1', 'true', 'yes')
+# Retune the existing collection in place instead of recreating it empty
+ANN_UPDATE = os.getenv('ANN_UPDATE', '').lower() in ('1', 'true', 'yes')
+
+if ANN_PROFILE not in ANN_PROFILES:
+    sys.exit(f"Unknown ANN_PROFILE {ANN_PROFILE!r}, choose one of: {', '.join(ANN_PROFILES)}")
+
 client = weaviate.connect_to_weaviate_cloud(
     cluster_url=WEAVIATE_CLUSTER_URL,
     auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
 )
 
+if ANN_UPDATE:
+    client.collections.get(name="crates").config.update(
+        vector_index_config=wc.Reconfigure.VectorIndex.hnsw(
+            ef=ANN_PROFILES[ANN_PROFILE],
+            quantizer=wc.Reconfigure.VectorIndex.Quantizer.pq() if ANN_PQ else None,
+        ),
+    )
+    client.close()
+    sys.exit()
+
 client.collections.delete(name="crates")
 print(client.is_connected())
 
 client.collections.create(
     name="crates",
     vectorizer_config=wvc.config.Configure.Vectorizer.text2vec_weaviate(model=MODEL),
+    vector_index_config=wc.Configure.VectorIndex.hnsw(
+        ef=ANN_PROFILES[ANN_PROFILE],
+        quantizer=wc.Configure.VectorIndex.Quantizer.pq() if ANN_PQ else None,
+    ),
     generative_config=wvc.config.Configure.Generative.friendliai(model="meta-llama-3.3-70b-instruct"),
     properties=[
         wc.Property(name="name", data_type=wc.DataType.TEXT),
@@ -1,36 +1,159 @@
 import os
+import io
 import sys
 import csv
+import asyncio
+import multiprocessing
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 import weaviate
 from weaviate.classes.init import Auth
+from weaviate.exceptions import WeaviateInsertManyAllFailedError
 
 WEAVIATE_CLUSTER_URL = os.getenv('WEAVIATE_URL')
 WEAVIATE_API_KEY = os.getenv('WEAVIATE_API_KEY')
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 500))
+# Total number of insert_many() requests in flight, split across the workers
+INGEST_CONCURRENCY = int(os.getenv('INGEST_CONCURRENCY', 4))
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', os.cpu_count() or 1))
+INGEST_READ_BUFFER = int(os.getenv('INGEST_READ_BUFFER', 1 << 20))
+COLUMNS = ["name", "readme", "description", "repository"]
 
-client = weaviate.connect_to_weaviate_cloud(
-    cluster_url=WEAVIATE_CLUSTER_URL,
-    auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
-)
-
-crates = client.collections.get(name="crates")
-
-try:
-    reader = csv.reader(sys.stdin)
-
-    for crate in reader:
-        try:
-            properties = {
-                "name": crate[0],
-                "readme": crate[1],
-                "description": crate[2],
-                "repository": crate[3],
-            }
-        except:
-            continue
-
-        uuid = crates.data.insert(properties)
-        print(f"{crate[0]}: {uuid}", end='\n')
-except Exception as e:
-    raise e
-finally:
-    client.close()
+
+def read_crates(stream):
+    """Parse crate rows from a CSV stream into an Arrow table.
+
+    Rows with extra fields keep their first four, as the csv-module loop did.
+    Rows with too few fields are skipped and reported on stderr.
+    """
+    wide_rows = []
+    short_rows = []
+
+    def handle_invalid_row(row):
+        (wide_rows if row.actual_columns > row.expected_columns else short_rows).append(row.text)
+        return "skip"
+
+    crates = pa_csv.read_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(column_names=COLUMNS),
+        parse_options=pa_csv.ParseOptions(
+            newlines_in_values=True,
+            invalid_row_handler=handle_invalid_row,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: pa.string() for column in COLUMNS},
+        ),
+    )
+
+    if wide_rows:
+        fields = [next(csv.reader(io.StringIO(text)))[:len(COLUMNS)] for text in wide_rows]
+        crates = pa.concat_tables([
+            crates,
+            pa.table({column: pa.array(values, pa.string()) for column, values in zip(COLUMNS, zip(*fields))}),
+        ])
+    if short_rows:
+        print(f"Skipped {len(short_rows)} rows with fewer than {len(COLUMNS)} fields", file=sys.stderr)
+    return crates
+
+async def insert_shard(shard, concurrency):
+    """Upload one shard with at most `concurrency` requests in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with weaviate.use_async_with_weaviate_cloud(
+        cluster_url=WEAVIATE_CLUSTER_URL,
+        auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
+    ) as client:
+        crates = client.collections.get(name="crates")
+
+        async def insert_many(batch):
+            # insert_many() raises instead of returning when every object in
+            # the batch fails; report that as a failure of each object so one
+            # bad batch does not abort the whole shard.
+            try:
+                result = await crates.data.insert_many(batch)
+            except WeaviateInsertManyAllFailedError as e:
+                return {}, {index: str(e) for index in range(len(batch))}
+            return result.uuids, {index: error.message for index, error in result.errors.items()}
+
+        async def insert_batch(batch):
+            """Upload one batch, print its results and return the number of failed objects"""
+            try:
+                uuids, errors = await insert_many(batch)
+                for index, uuid in uuids.items():
+                    print(f"{batch[index]['name']}: {uuid}", end='\n')
+                # Retry failed objects once; transient errors such as
+                # timeouts usually clear on the second attempt.
+                if errors:
+                    batch = [batch[index] for index in errors]
+                    uuids, errors = await insert_many(batch)
+                    for index, uuid in uuids.items():
+                        print(f"{batch[index]['name']}: {uuid}", end='\n')
+                for index, error in errors.items():
+                    print(f"{batch[index]['name']}: {error}", file=sys.stderr)
+                return len(errors)
+            finally:
+                semaphore.release()
+
+        # Double-buffer: convert the next record batch into property dicts
+        # while earlier batches are uploading, then wait for a free slot.
+        # Finished tasks are reaped as we go, so only concurrency + 1
+        # payloads are held in memory at once.
+        failed = 0
+        tasks = set()
+        for record_batch in shard.to_batches(max_chunksize=INGEST_BATCH_SIZE):
+            batch = record_batch.to_pylist()
+            await semaphore.acquire()
+            done = {task for task in tasks if task.done()}
+            tasks -= done
+            failed += sum(task.result() for task in done)
+            tasks.add(asyncio.create_task(insert_batch(batch)))
+        failed += sum(await asyncio.gather(*tasks))
+    return failed
+
+
+def ingest_shard(shard, concurrency):
+    # Each worker process opens its own client once it has started; Weaviate
+    # clients hold gRPC channels that must not be shared across processes.
+    return asyncio.run(insert_shard(shard, concurrency))
+
+
+def main():
+    # A CSV path argument is memory-mapped, so the parser reads pages straight
+    # from the page cache instead of copying each block through read() calls
+    if len(sys.argv) > 1:
+        source = pa.memory_map(sys.argv[1])
+    else:
+        source = pa.input_stream(sys.stdin.buffer, buffer_size=INGEST_READ_BUFFER)
+    with source:
+        crates = read_crates(source)
+    if not crates.num_rows:
+        return
+
+    # Every worker needs at least one request slot of the concurrency budget
+    num_workers = max(1, min(INGEST_WORKERS, INGEST_CONCURRENCY, crates.num_rows))
+    # pool.map pickles each shard, and pickling a table slice serializes every
+    # whole buffer it overlaps, so a plain slice would ship the full table to
+    # each worker. take() copies each shard's rows into buffers of its own.
+    shard_size = -(-crates.num_rows // num_workers)
+    shards = [
+        crates.take(pa.array(range(start, min(start + shard_size, crates.num_rows))))
+        for start in range(0, crates.num_rows, shard_size)
+    ]
+
+    concurrency = [
+        INGEST_CONCURRENCY // len(shards) + (index < INGEST_CONCURRENCY % len(shards))
+        for index in range(len(shards))
+    ]
+
+    # Spawn rather than fork: read_csv has already started Arrow's thread
+    # pool, and forking a multi-threaded process can deadlock the children.
+    # The shards are pickled either way.
+    with multiprocessing.get_context("spawn").Pool(num_workers) as pool:
+        failed = sum(pool.starmap(ingest_shard, zip(shards, concurrency)))
+
+    if failed:
+        print(f"{failed} objects failed to import", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,49 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, model_validator
 from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+from dataclasses import dataclass
+from abc import ABC, abstractmethod
 import uvicorn
 import os
+import asyncio
+import time
+import math
+import heapq
+import operator
 from datetime import datetime
 import uuid
 
+import grpc
+import marisa_trie
+import orjson
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, generate_latest
 import weaviate
 from weaviate.classes.init import Auth
+from weaviate.classes.query import MetadataQuery
+from weaviate.exceptions import WeaviateConnectionError, WeaviateGRPCUnavailableError, WeaviateTimeoutError
 
 # Data Models
-class Record(BaseModel):
-    id: Optional[str] = None
-
+@dataclass(slots=True)
+class RecordRow:
+    """Stored record with a fixed slotted layout and no per-instance __dict__"""
+    id: str
     title: str
     content: str
     repo_url: str
     package_url: str
     description: str
-    tags: Optional[List[str]] = []
-    metadata: Optional[Dict[str, Any]] = {}
-    created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
+    tags: List[str]
+    metadata: Dict[str, Any]
+    created_at: datetime
+    updated_at: datetime
+
+    # Lowercased search fields, filled in when the record is indexed
+    search_blob: str = ""
+    search_tags: frozenset[str] = frozenset()
 
 class RecordCreate(BaseModel):
     title: str
@@ -33,31 +54,397 @@ class RecordCreate(BaseModel):
     tags: Optional[List[str]] = []
     metadata: Optional[Dict[str, Any]] = {}
 
+    @model_validator(mode="after")
+    def check_serializable(self):
+        """Reject records the orjson response renderer cannot encode, such as
+        integers beyond 64 bits, before anything is stored"""
+        try:
+            orjson.dumps(self.__dict__)
+        except orjson.JSONEncodeError as e:
+            raise ValueError(f"Record is not serializable: {e}")
+        return self
+
 class RecordResponse(BaseModel):
     name: str
     description: str
     readme: str
     crates_url: str
     repo_url: str
+    distance: Optional[float] = None
+
+class StoredRecordResponse(BaseModel):
+    id: str
+    title: str
+    content: str
+    repo_url: str
+    package_url: str
+    description: str
+    tags: List[str]
+    metadata: Dict[str, Any]
+    created_at: datetime
+    updated_at: datetime
 
 class SearchQuery(BaseModel):
     query: str
     limit: Optional[int] = 10
     tags: Optional[List[str]] = None
+    prefix: Optional[bool] = False
 
 class SearchResponse(BaseModel):
     results: List[RecordResponse]
     total: int
     query: str
 
+class StoredRecordSearchResponse(BaseModel):
+    results: List[StoredRecordResponse]
+    total: int
+    query: str
+
 # In-memory storage (replace with database in production)
-records_storage: Dict[str, Record] = {}
+records_storage: Dict[str, RecordRow] = {}
+
+# Stored-record endpoints render these fields of a RecordRow straight to JSON
+# and only use StoredRecordResponse to document the schema
+STORED_RECORD_FIELDS = tuple(StoredRecordResponse.model_fields)
+stored_record_values = operator.attrgetter(*STORED_RECORD_FIELDS)
+
+def stored_record_body(record: RecordRow) -> Dict[str, Any]:
+    """Build the StoredRecordResponse body of a record without validating it"""
+    return dict(zip(STORED_RECORD_FIELDS, stored_record_values(record)))
+
+def generate_ids(count: int) -> List[str]:
+    """Generate random UUID4 strings from a single os.urandom call"""
+    random_bytes = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=random_bytes[i:i + 16], version=4)) for i in range(0, 16 * count, 16)]
+
+# Substring search index: trigram -> record IDs, plus a per-record Bloom
+# filter of its trigrams used to gate candidates cheaply
+DEFAULT_BLOOM_N = 256
+DEFAULT_BLOOM_FP = 0.01
+MIN_TRIGRAM_QUERY_LEN = 3
+MAX_INTERSECTED_POSTINGS = 3
+
+class BloomFilter:
+    """Bloom filter over strings using double hashing"""
+
+    def __init__(self, n: int = DEFAULT_BLOOM_N, fp: float = DEFAULT_BLOOM_FP):
+        self.size = math.ceil(-n * math.log(fp) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.size / n * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        h = hash(item)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.num_hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+trigram_postings: Dict[str, set[str]] = {}
+record_blooms: Dict[str, BloomFilter] = {}
+
+def trigrams(text: str) -> set[str]:
+    """Character trigrams of a string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def index_record(record: RecordRow):
+    """Add a record's title, content and tag trigrams to the search index"""
+    fields = [record.title.lower(), record.content.lower(), *(tag.lower() for tag in record.tags)]
+    # Fields are newline-separated so a query cannot match across two of them
+    record.search_blob = "\n".join(fields)
+    record.search_tags = frozenset(fields[2:])
+
+    grams = set()
+    for field in fields:
+        grams |= trigrams(field)
+
+    bloom = BloomFilter(n=max(DEFAULT_BLOOM_N, len(grams)))
+    for gram in grams:
+        trigram_postings.setdefault(gram, set()).add(record.id)
+        bloom.add(gram)
+    record_blooms[record.id] = bloom
+    pending_trie_records.append(record)
+
+# Prefix tries over lowercased titles and the tag vocabulary. MARISA tries are
+# static, so records inserted since the last build are kept in a pending list
+# and the tries are rebuilt once that list grows past the threshold.
+TRIE_REBUILD_THRESHOLD = 1000
+title_trie = marisa_trie.BytesTrie()
+tag_trie = marisa_trie.Trie()
+pending_trie_records: List[RecordRow] = []
+
+def rebuild_tries():
+    """Rebuild the title and tag tries from all stored records"""
+    global title_trie, tag_trie
+    records = list(records_storage.values())
+    title_trie = marisa_trie.BytesTrie((record.title.lower(), record.id.encode()) for record in records)
+    tag_trie = marisa_trie.Trie({tag for record in records for tag in record.search_tags})
+    pending_trie_records.clear()
+
+def refresh_tries():
+    """Rebuild the tries if too many records are pending"""
+    if len(pending_trie_records) >= TRIE_REBUILD_THRESHOLD:
+        rebuild_tries()
+
+def title_prefix_matches(prefix: str) -> set[str]:
+    """IDs of records whose lowercased title starts with prefix"""
+    refresh_tries()
+    record_ids = {value.decode() for _, value in title_trie.items(prefix)}
+    record_ids.update(record.id for record in pending_trie_records if record.title.lower().startswith(prefix))
+    return record_ids
+
+def tag_prefix_matches(prefix: str) -> set[str]:
+    """Known lowercased tags starting with prefix"""
+    refresh_tries()
+    tags = set(tag_trie.keys(prefix))
+    tags.update(
+        tag
+        for record in pending_trie_records
+        for tag in record.search_tags
+        if tag.startswith(prefix)
+    )
+    return tags
+
+def record_properties(record: RecordCreate) -> Dict[str, Any]:
+    """Properties to store for a new record, with defaults filled in"""
+    return {
+        "title": record.title,
+        "content": record.content,
+        "repo_url": record.repo_url or "",
+        "package_url": record.package_url or "",
+        "description": record.description or "",
+        "tags": record.tags or [],
+        "metadata": record.metadata or {},
+    }
+
+class VectorBackend(ABC):
+    """Record storage backend that inserts and fetches in batches"""
+
+    @abstractmethod
+    async def insert_batch(self, properties_list: List[Dict[str, Any]]) -> List[str]:
+        """Store records in a single call and return their IDs in order"""
+
+    @abstractmethod
+    async def fetch_many(self, record_ids: List[str]) -> List[RecordRow]:
+        """Fetch records by ID in a single call, in the same order"""
+
+class InMemoryBackend(VectorBackend):
+    """Backend over the in-memory records_storage"""
+
+    async def insert_batch(self, properties_list: List[Dict[str, Any]]) -> List[str]:
+        now = datetime.utcnow()
+        record_ids = generate_ids(len(properties_list))
+        for record_id, properties in zip(record_ids, properties_list):
+            record = RecordRow(id=record_id, created_at=now, updated_at=now, **properties)
+            records_storage[record_id] = record
+            index_record(record)
+        return record_ids
+
+    async def fetch_many(self, record_ids: List[str]) -> List[RecordRow]:
+        return [records_storage[record_id] for record_id in record_ids]
+
+backend: VectorBackend = InMemoryBackend()
+
+# LRU cache of /search responses keyed by (query, limit, with_distance). Entries expire after
+# SEARCH_CACHE_TTL seconds, since the crates collection is updated out of band
+# by the ingest pipeline.
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 60))
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 4096))
+search_cache: OrderedDict[tuple, tuple[float, bytes]] = OrderedDict()
+
+def get_cached_search(key: tuple) -> Optional[bytes]:
+    """Return a cached, already rendered search response if present and not expired"""
+    entry = search_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, response = entry
+    if expires_at <= time.monotonic():
+        del search_cache[key]
+        return None
+    search_cache.move_to_end(key)
+    return response
+
+def cache_search(key: tuple, response: bytes):
+    """Store a rendered search response, evicting the least recently used entry"""
+    search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, response)
+    search_cache.move_to_end(key)
+    if len(search_cache) > SEARCH_CACHE_SIZE:
+        search_cache.popitem(last=False)
+
+# Identical (query, limit, with_distance) searches arriving within
+# QUERY_BATCH_WINDOW seconds of the first one share its Weaviate request.
+# Every distinct search is sent as soon as it arrives.
+QUERY_BATCH_WINDOW = 0.005
+
+class QueryBatcher:
+    """Coalesce identical concurrent searches into a single request"""
+
+    def __init__(self, search, window: float = QUERY_BATCH_WINDOW):
+        self.search = search
+        self.window = window
+        self.open: Dict[tuple, asyncio.Task] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def submit(self, query: str, limit: Optional[int], with_distance: bool = False):
+        """Run a search, or join an identical one started within the window"""
+        key = (query, limit, with_distance)
+        task = self.open.get(key)
+        if task is None:
+            task = asyncio.create_task(self.search(*key))
+            self.open[key] = task
+            self.tasks.add(task)
+            task.add_done_callback(self._finished)
+            asyncio.get_running_loop().call_later(self.window, self._close, key, task)
+        # Shielded so a caller going away does not cancel the search for the others
+        return await asyncio.shield(task)
+
+    def _close(self, key: tuple, task: asyncio.Task):
+        if self.open.get(key) is task:
+            del self.open[key]
+
+    def _finished(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        # Mark the error as retrieved even if every caller has gone away
+        if not task.cancelled():
+            task.exception()
+
+# Flow control around Weaviate: at most WEAVIATE_MAX_CONCURRENCY queries in
+# flight, and a circuit breaker that fails fast for WEAVIATE_BREAKER_RESET
+# seconds after WEAVIATE_BREAKER_THRESHOLD consecutive failures
+WEAVIATE_MAX_CONCURRENCY = int(os.environ.get("WEAVIATE_MAX_CONCURRENCY", 64))
+WEAVIATE_BREAKER_THRESHOLD = int(os.environ.get("WEAVIATE_BREAKER_THRESHOLD", 5))
+WEAVIATE_BREAKER_RESET = float(os.environ.get("WEAVIATE_BREAKER_RESET", 30))
+
+WEAVIATE_IN_FLIGHT = Gauge("weaviate_requests_in_flight", "Weaviate queries currently running")
+WEAVIATE_WAITING = Gauge("weaviate_requests_waiting", "Weaviate queries waiting for a concurrency slot")
+WEAVIATE_FAILURES = Counter("weaviate_request_failures", "Weaviate queries that raised an error")
+WEAVIATE_CIRCUIT_OPEN = Gauge("weaviate_circuit_open", "1 while the Weaviate circuit breaker is open")
+
+# Errors meaning the cluster is unreachable or overloaded. Query errors such as
+# a bad filter come back from a healthy cluster and must not open the circuit.
+CLUSTER_FAILURES = (WeaviateConnectionError, WeaviateTimeoutError, WeaviateGRPCUnavailableError, asyncio.TimeoutError)
+CLUSTER_FAILURE_CODES = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+
+def is_cluster_failure(exc: Optional[BaseException]) -> bool:
+    """Whether an error, or any error it was raised from, means Weaviate is unavailable"""
+    # The client and connect_weaviate re-raise gRPC and connection errors as
+    # other exceptions, so walk the whole cause/context chain
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, CLUSTER_FAILURES):
+            return True
+        if isinstance(exc, grpc.aio.AioRpcError) and exc.code() in CLUSTER_FAILURE_CODES:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+class CircuitBreaker:
+    """Fail fast after repeated cluster failures until a probe request succeeds"""
+
+    def __init__(self, threshold: int = WEAVIATE_BREAKER_THRESHOLD, reset_timeout: float = WEAVIATE_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        """Whether a request may go through. Once the cool-down has passed a
+        single probe is let through and the rest keep failing fast until it
+        succeeds; a failed probe starts a new cool-down."""
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.reset_timeout:
+            return False
+        # Restart the cool-down, so no other request is let through while the
+        # probe is running
+        self.opened_at = now
+        return True
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+async def near_text_search(query: str, limit: Optional[int], with_distance: bool):
+    """Run a near_text query against the crates collection"""
+    semaphore = app.state.weaviate_semaphore
+    breaker = app.state.weaviate_breaker
+
+    WEAVIATE_WAITING.inc()
+    try:
+        await semaphore.acquire()
+    finally:
+        WEAVIATE_WAITING.dec()
+
+    try:
+        with WEAVIATE_IN_FLIGHT.track_inprogress():
+            client = await get_weaviate_client()
+            crates = client.collections.get(name="crates")
+            response = await crates.query.near_text(
+                query=query,
+                limit=limit,
+                # Only ask for distances when the caller wants them
+                return_metadata=MetadataQuery(distance=True) if with_distance else None,
+            )
+    except Exception as e:
+        WEAVIATE_FAILURES.inc()
+        # Any other error still means the cluster answered
+        if is_cluster_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    finally:
+        semaphore.release()
+
+    breaker.record_success()
+    return response
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared Weaviate client on startup and close it on shutdown"""
+    app.state.weaviate_client = None
+    app.state.weaviate_lock = asyncio.Lock()
+    app.state.weaviate_semaphore = asyncio.Semaphore(WEAVIATE_MAX_CONCURRENCY)
+    app.state.weaviate_breaker = CircuitBreaker()
+    WEAVIATE_CIRCUIT_OPEN.set_function(lambda: float(app.state.weaviate_breaker.is_open()))
+    if os.environ.get("WEAVIATE_URL") and os.environ.get("WEAVIATE_API_KEY"):
+        try:
+            app.state.weaviate_client = await connect_weaviate()
+        except HTTPException:
+            # Retried by get_weaviate_client on the first search
+            pass
+    app.state.query_batcher = QueryBatcher(near_text_search)
+    yield
+    await app.state.query_batcher.stop()
+    if app.state.weaviate_client is not None:
+        await app.state.weaviate_client.close()
 
 # Create FastAPI instance
 app = FastAPI(
     title="Rusty-RAG API",
     description="AI Search API for Developer Packages with CRUD operations",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -69,8 +456,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-async def get_weaviate_client():
-    """Get Weaviate client connection"""
+async def connect_weaviate():
+    """Open a Weaviate client connection"""
     try:
         # Best practice: store your credentials in environment variables
         weaviate_url = os.environ.get("WEAVIATE_URL")
@@ -83,18 +470,26 @@ async def get_weaviate_client():
             )
 
         # Connect to Weaviate Cloud
-        client = weaviate.connect_to_weaviate_cloud(
+        client = weaviate.use_async_with_weaviate_cloud(
             cluster_url=weaviate_url,
             auth_credentials=Auth.api_key(weaviate_api_key),
         )
+        await client.connect()
 
-        if not client.is_ready():
+        if not await client.is_ready():
             raise HTTPException(status_code=500, detail="Weaviate client is not ready")
 
         return client
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to connect to Weaviate: {str(e)}")
 
+async def get_weaviate_client():
+    """Get the shared Weaviate client, connecting on first use"""
+    async with app.state.weaviate_lock:
+        if app.state.weaviate_client is None:
+            app.state.weaviate_client = await connect_weaviate()
+    return app.state.weaviate_client
+
 @app.get("/")
 async def root():
     """Root endpoint that returns a hello world message"""
@@ -105,6 +500,11 @@ async def health_check():
     """Health check endpoint for monitoring"""
     return {"status": "healthy", "service": "hello-world-api"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this worker"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/hello/{name}")
 async def hello_name(name: str):
     """Personalized hello endpoint"""
@@ -112,178 +512,164 @@ async def hello_name(name: str):
 
 # CRUD Operations
 
-@app.post("/records", response_model=RecordResponse)
+@app.post("/records", response_model=None, responses={200: {"model": StoredRecordResponse}})
 async def create_record(record: RecordCreate):
     """Insert a single record"""
     try:
-        # Generate unique ID and timestamps
-        record_id = str(uuid.uuid4())
-        now = datetime.utcnow()
-
-        # Create new record
-        new_record = Record(
-            id=record_id,
-            title=record.title,
-            content=record.content,
-            repo_url=record.repo_url or "",
-            package_url=record.package_url or "",
-            description=record.description or "",
-            tags=record.tags or [],
-            metadata=record.metadata or {},
-            created_at=now,
-            updated_at=now
-        )
+        [record_id] = await backend.insert_batch([record_properties(record)])
+        [new_record] = await backend.fetch_many([record_id])
 
-        # Store in memory
-        records_storage[record_id] = new_record
-
-        return RecordResponse(
-            id=new_record.id,
-            title=new_record.title,
-            content=new_record.content,
-            repo_url=new_record.repo_url,
-            package_url=new_record.package_url,
-            description=new_record.description,
-            tags=new_record.tags,
-            metadata=new_record.metadata,
-            created_at=new_record.created_at,
-            updated_at=new_record.updated_at
-        )
+        return ORJSONResponse(stored_record_body(new_record))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating record: {str(e)}")
 
-@app.post("/records/batch", response_model=List[RecordResponse])
+@app.post("/records/batch", response_model=None, responses={200: {"model": List[StoredRecordResponse]}})
 async def create_multiple_records(records: List[RecordCreate]):
     """Insert multiple records"""
     try:
         if len(records) > 100:  # Limit batch size
             raise HTTPException(status_code=400, detail="Batch size cannot exceed 100 records")
 
-        created_records = []
-        now = datetime.utcnow()
-
-        for record in records:
-            # Generate unique ID
-            record_id = str(uuid.uuid4())
-
-            # Create new record
-            new_record = Record(
-                id=record_id,
-                title=record.title,
-                content=record.content,
-                repo_url=record.repo_url or "",
-                package_url=record.package_url or "",
-                description=record.description or "",
-                tags=record.tags or [],
-                metadata=record.metadata or {},
-                created_at=now,
-                updated_at=now
-            )
+        # Hand the whole batch to the backend in a single call
+        properties_list = [record_properties(record) for record in records]
+        record_ids = await backend.insert_batch(properties_list)
 
-            # Store in memory
-            records_storage[record_id] = new_record
-
-            created_records.append(RecordResponse(
-                id=new_record.id,
-                title=new_record.title,
-                content=new_record.content,
-                repo_url=new_record.repo_url,
-                package_url=new_record.package_url,
-                description=new_record.description,
-                tags=new_record.tags,
-                metadata=new_record.metadata,
-                created_at=new_record.created_at,
-                updated_at=new_record.updated_at
-            ))
-
-        return created_records
+        return ORJSONResponse([
+            stored_record_body(new_record)
+            for new_record in await backend.fetch_many(record_ids)
+        ])
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating records: {str(e)}")
 
-@app.get("/search", response_model=SearchResponse)
-async def search_records(query: str, limit: int | None = None):
+@app.post("/records/search", response_model=None, responses={200: {"model": StoredRecordSearchResponse}})
+async def search_stored_records(search: SearchQuery):
+    """Search stored records by query and optional tags"""
+    try:
+        query = search.query.lower()
+
+        # Intersect the postings of the rarest query trigrams, gate the
+        # candidates on the remaining trigrams with their Bloom filters, then
+        # verify the tag filter and the full substring match on survivors.
+        # Queries too short to have a trigram fall back to a full scan.
+        # Prefix queries match titles through the title trie instead.
+        if search.prefix:
+            candidates = [records_storage[record_id] for record_id in title_prefix_matches(query)]
+        elif len(query) >= MIN_TRIGRAM_QUERY_LEN:
+            grams = sorted(trigrams(query), key=lambda g: len(trigram_postings.get(g, ())))
+            candidate_ids = set.intersection(
+                *(trigram_postings.get(gram, set()) for gram in grams[:MAX_INTERSECTED_POSTINGS])
+            )
+            bloom_grams = grams[MAX_INTERSECTED_POSTINGS:]
+            candidates = [
+                records_storage[record_id]
+                for record_id in candidate_ids
+                if all(gram in record_blooms[record_id] for gram in bloom_grams)
+            ]
+        else:
+            candidates = list(records_storage.values())
+
+        tags = {tag.lower() for tag in search.tags} if search.tags else None
+        matches = []
+        for record in candidates:
+            if tags and tags.isdisjoint(record.search_tags):
+                continue
+            if search.prefix or query in record.search_blob:
+                matches.append(record)
+
+        by_created_at = operator.attrgetter("created_at")
+        if search.limit is None:
+            results = sorted(matches, key=by_created_at, reverse=True)
+        else:
+            results = heapq.nlargest(search.limit, matches, key=by_created_at)
+
+        return ORJSONResponse({
+            "results": [stored_record_body(record) for record in results],
+            "total": len(matches),
+            "query": search.query,
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching records: {str(e)}")
+
+@app.get("/tags", response_model=List[str])
+async def suggest_tags(prefix: str = "", limit: int = 20):
+    """Suggest known tags starting with a prefix"""
+    return sorted(tag_prefix_matches(prefix.lower()))[:limit]
+
+# The body is built as plain dicts and rendered by orjson directly; with a
+# response_model FastAPI would validate and serialize every result again.
+@app.get("/search", response_model=None, responses={200: {"model": SearchResponse}})
+async def search_records(
+    query: str,
+    limit: int | None = None,
+    with_distance: bool = False,
+    cache_control: Optional[str] = Header(default=None),
+):
     """Search records by query and optional tags"""
-    client = await get_weaviate_client()
+    # "Cache-Control: no-cache" skips the cached response and refreshes it
+    cache_key = (query, limit, with_distance)
+    if "no-cache" not in (cache_control or ""):
+        cached = get_cached_search(cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+
+    if not app.state.weaviate_breaker.allow():
+        raise HTTPException(status_code=503, detail="Weaviate is unavailable, please retry later")
+
     try:
-        crates = client.collections.get(name="crates")
-        response = crates.query.near_text(
-            query=query,
-            limit=limit,
-        )
+        response = await app.state.query_batcher.submit(query, limit, with_distance)
 
         records = []
         for crate in response.objects:
-            records.append(RecordResponse(
-                name=crate.properties['name'],
-                description=crate.properties['description'],
-                readme=crate.properties['readme'],
-                crates_url=f"https://crates.io/crates/{crate.properties['name']}",
-                repo_url=crate.properties['repository'],
-            ))
-        return SearchResponse(
-            results=records,
-            total=len(records),
-            query=query,
-        )
+            record = {
+                "name": crate.properties['name'],
+                "description": crate.properties['description'],
+                "readme": crate.properties['readme'],
+                "crates_url": f"https://crates.io/crates/{crate.properties['name']}",
+                "repo_url": crate.properties['repository'],
+            }
+            # Only requested distances go on the wire
+            if with_distance:
+                record["distance"] = crate.metadata.distance
+            records.append(record)
+        search_response = ORJSONResponse({
+            "results": records,
+            "total": len(records),
+            "query": query,
+        })
+        cache_search(cache_key, search_response.body)
+        return search_response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        client.close()
 
-@app.get("/records", response_model=List[RecordResponse])
+@app.get("/records", response_model=None, responses={200: {"model": List[StoredRecordResponse]}})
 async def get_all_records(limit: int = 50, offset: int = 0):
     """Get all records with pagination"""
     try:
-        all_records = list(records_storage.values())
-        all_records.sort(key=lambda x: x.created_at, reverse=True)
-
-        # Apply pagination
-        start = offset
-        end = offset + limit
-        paginated_records = all_records[start:end]
-
-        return [
-            RecordResponse(
-                id=record.id,
-                title=record.title,
-                content=record.content,
-                repo_url=record.repo_url,
-                package_url=record.package_url,
-                description=record.description,
-                tags=record.tags,
-                metadata=record.metadata,
-                created_at=record.created_at,
-                updated_at=record.updated_at
-            )
-            for record in paginated_records
-        ]
+        # Only the newest offset + limit records are needed for the page,
+        # so select them with a bounded heap instead of sorting everything
+        paginated_records = heapq.nlargest(
+            offset + limit, records_storage.values(), key=operator.attrgetter("created_at")
+        )[offset:]
+
+        return ORJSONResponse([stored_record_body(record) for record in paginated_records])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving records: {str(e)}")
 
-@app.get("/records/{record_id}", response_model=RecordResponse)
+@app.get("/records/{record_id}", response_model=None, responses={200: {"model": StoredRecordResponse}})
 async def get_record(record_id: str):
     """Get a specific record by ID"""
     if record_id not in records_storage:
         raise HTTPException(status_code=404, detail="Record not found")
 
     record = records_storage[record_id]
-    return RecordResponse(
-        id=record.id,
-        title=record.title,
-        content=record.content,
-        repo_url=record.repo_url,
-        package_url=record.package_url,
-        description=record.description,
-        tags=record.tags,
-        metadata=record.metadata,
-        created_at=record.created_at,
-        updated_at=record.updated_at
-    )
+    return ORJSONResponse(stored_record_body(record))
 
 # For local development only
 if __name__ == "__main__":
     # Get port from environment variable (required for Cloud Run)
     port = int(os.environ.get("PORT", 8080))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")